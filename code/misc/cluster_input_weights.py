@@ -1,4 +1,4 @@
-import os, math
+import os, sys, math
 import numpy as np
 import matplotlib.cm as cmap
 import matplotlib.pyplot as plt
@@ -6,18 +6,24 @@ import brian as b
 
 from sklearn.cluster import KMeans
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'train'))
+from util import load_connection
+
 np.set_printoptions(threshold=np.nan)
 
 
 def get_matrix_from_file(file_name, n_src, n_tgt):
 	'''
-	Given the name of a file pointing to a .npy ndarray object, load it into
-	'weight_matrix' and return it
+	Given the name of a file pointing to a saved weight matrix ('.npy' or '.npz'), or to an
+	array of (row, column, value) triples, load it into 'weight_matrix' and return it
 	'''
 
 	# load the stored ndarray into 'readout', instantiate 'weight_matrix' as
 	# correctly-shaped zeros matrix
-	readout = np.load(file_name)
+	readout = load_connection(file_name)
+	if readout.shape == (n_src, n_tgt):
+		return readout
+
 	weight_matrix = np.zeros((n_src, n_tgt))
 
 	# read the 'readout' ndarray values into weight_matrix by (row, column) indices
@@ -48,14 +54,14 @@ top_level_path = '../../'
 weight_dir = top_level_path + 'weights/csnn_pc/'
 
 print '\n'
-print '\n'.join([ str(idx) + ' | ' + file_name for idx, file_name in enumerate([ file_name for file_name in sorted(os.listdir(weight_dir)) if 'XeAe' in file_name ]) ])
+print '\n'.join([ str(idx) + ' | ' + file_name for idx, file_name in enumerate([ file_name for file_name in sorted(os.listdir(weight_dir)) if 'XeAe' in file_name and os.path.splitext(file_name)[1] in ['.npy', '.npz'] ]) ])
 print '\n'
 
 to_plot = raw_input('Enter the index of the file from above which you\'d like to plot: ')
 if to_plot == '':
-	file_name = [ file_name for file_name in sorted(os.listdir(weight_dir)) if 'XeAe' in file_name ][0]
+	file_name = [ file_name for file_name in sorted(os.listdir(weight_dir)) if 'XeAe' in file_name and os.path.splitext(file_name)[1] in ['.npy', '.npz'] ][0]
 else:
-	file_name = [ file_name for file_name in sorted(os.listdir(weight_dir)) if 'XeAe' in file_name ][int(to_plot)]
+	file_name = [ file_name for file_name in sorted(os.listdir(weight_dir)) if 'XeAe' in file_name and os.path.splitext(file_name)[1] in ['.npy', '.npz'] ][int(to_plot)]
 
 # number of inputs to the network
 n_input = 784
@@ -11,16 +11,22 @@ from scipy.sparse import coo_matrix
 from struct import unpack
 from brian import *
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'train'))
+from util import load_connection
+
 
 def get_matrix_from_file(file_name, n_src, n_tgt):
 	'''
-	Given the name of a file pointing to a .npy ndarray object, load it into
-	'weight_matrix' and return it
+	Given the name of a file pointing to a saved weight matrix ('.npy' or '.npz'), or to an
+	array of (row, column, value) triples, load it into 'weight_matrix' and return it
 	'''
 
 	# load the stored ndarray into 'readout', instantiate 'weight_matrix' as 
 	# correctly-shaped zeros matrix
-	readout = np.load(file_name)
+	readout = load_connection(file_name)
+	if readout.shape == (n_src, n_tgt):
+		return readout
+
 	weight_matrix = np.zeros((n_src, n_tgt))
 
 	# read the 'readout' ndarray values into weight_matrix by (row, column) indices
@@ -33,12 +39,12 @@ top_level_path = '../../'
 weight_path = top_level_path + 'weights/csnn_pc/'
 
 print '\n'
-print '\n'.join([ str(idx + 1) + ' | ' + file_name for idx, file_name in enumerate([ file_name for file_name in sorted(os.listdir(weight_path)) if 'AeAe' in file_name and 'all' in file_name and '.npy' in file_name ]) ])
+print '\n'.join([ str(idx + 1) + ' | ' + file_name for idx, file_name in enumerate([ file_name for file_name in sorted(os.listdir(weight_path)) if 'AeAe' in file_name and 'all' in file_name and os.path.splitext(file_name)[1] in ['.npy', '.npz'] ]) ])
 print '\n'
 
 to_get = raw_input('Enter the index of the file from above which you\'d like to plot: ')
 
-file_name = [ file_name for file_name in sorted(os.listdir(weight_path)) if 'AeAe' in file_name and 'all' in file_name and '.npy' in file_name ][int(to_get) - 1]
+file_name = [ file_name for file_name in sorted(os.listdir(weight_path)) if 'AeAe' in file_name and 'all' in file_name and os.path.splitext(file_name)[1] in ['.npy', '.npz'] ][int(to_get) - 1]
 
 n_input = 784
 n_input_sqrt = int(math.sqrt(n_input))
@@ -57,7 +63,7 @@ weight_matrix = get_matrix_from_file(weight_path + file_name, conv_features * n_
 weight_matrix[weight_matrix < np.percentile(weight_matrix[np.where(weight_matrix != 0)], 99)] = 0.0
 weight_matrix[weight_matrix > 0.0] = 1
 
-np.savetxt(top_level_path + 'data/patch_connectivity_matrices/' + file_name.split('.npy')[0] + '.txt', weight_matrix)
+np.savetxt(top_level_path + 'data/patch_connectivity_matrices/' + os.path.splitext(file_name)[0] + '.txt', weight_matrix)
 
 print 'Total number of possible connections:', (conv_features * n_e) ** 2
 print 'Shape of connectivity matrix:', weight_matrix.shape
@@ -14,11 +14,10 @@ def mhat(t, sigma=1.0, scale=1.0, shift=0.0, max_excite=np.inf, max_inhib=-np.in
 
 	See https://en.wikipedia.org/wiki/Mexican_hat_wavelet for more details and references.
 	'''
-	return np.maximum(np.minimum(scale * np.divide(2, np.sqrt(3 * \
-								sigma) * (np.pi ** 0.25)) * (1.0 - \
-								np.square(np.divide(t, sigma))) * \
-								np.exp(-np.divide(np.square(t), 2 * \
-								np.square(sigma))) + shift, max_excite), max_inhib)
+	normalization = 2.0 / (np.sqrt(3 * sigma) * np.pi ** 0.25)
+	squared_t = np.square(np.divide(t, sigma))
+
+	return np.clip(scale * normalization * (1.0 - squared_t) * np.exp(-0.5 * squared_t) + shift, max_inhib, max_excite)
 
 
 if __name__ == '__main__':
@@ -419,9 +419,9 @@ def build_network():
 				# get weight matrix depending on training or test phase
 				if test_mode:
 					if save_best_model:
-						weight_matrix = np.load(os.path.join(best_weights_dir, '_'.join([conn_name, ending + '_best.npy'])))
+						weight_matrix = load_connection(os.path.join(best_weights_dir, '_'.join([conn_name, ending + '_best'])))
 					else:
-						weight_matrix = np.load(os.path.join(end_weights_dir, '_'.join([conn_name, ending + '_end.npy'])))
+						weight_matrix = load_connection(os.path.join(end_weights_dir, '_'.join([conn_name, ending + '_end'])))
 				
 				# create a connection from the first group in conn_name with the second group
 				connections[conn_name] = b.Connection(neuron_groups[conn_name[0:2]], neuron_groups[conn_name[2:4]], structure='sparse', state='g' + conn_type[0])
@@ -478,9 +478,9 @@ def build_network():
 			# get weight matrix depending on training or test phase
 			if test_mode:
 				if save_best_model:
-					weight_matrix = np.load(os.path.join(best_weights_dir, '_'.join([conn_name, ending + '_best.npy'])))
+					weight_matrix = load_connection(os.path.join(best_weights_dir, '_'.join([conn_name, ending + '_best'])))
 				else:
-					weight_matrix = np.load(os.path.join(end_weights_dir, '_'.join([conn_name, ending + '_end.npy'])))
+					weight_matrix = load_connection(os.path.join(end_weights_dir, '_'.join([conn_name, ending + '_end'])))
 			else:
 				weight_matrix = (b.random([window ** 2, n_neurons]) + 0.01) * 0.3
 
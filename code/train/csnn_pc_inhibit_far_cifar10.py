@@ -276,14 +276,13 @@ def get_patch_weights():
 	'''
 	rearranged_weights = np.zeros((conv_features * n_e, conv_features * n_e))
 	connection = connections['AeAe'][:]
+	lattice = get_lattice_adjacency(n_e_sqrt, lattice_structure)
 
 	for feature in xrange(conv_features):
 		for other_feature in xrange(conv_features):
 			if feature != other_feature:
-				for this_n in xrange(n_e):
-					for other_n in xrange(n_e):
-						if is_lattice_connection(n_e_sqrt, this_n, other_n, lattice_structure):
-							rearranged_weights[feature * n_e + this_n, other_feature * n_e + other_n] = connection[feature * n_e + this_n, other_feature * n_e + other_n]
+				for this_n, other_n in zip(*np.nonzero(lattice)):
+					rearranged_weights[feature * n_e + this_n, other_feature * n_e + other_n] = connection[feature * n_e + this_n, other_feature * n_e + other_n]
 
 	return rearranged_weights
 
@@ -707,9 +706,9 @@ def build_network():
 				# get weights from file if we are in test mode
 				if test_mode:
 					if save_best_model:
-						weight_matrix = np.load(os.path.join(best_weights_dir, '_'.join([conn_name, ending + '_best.npy'])))
+						weight_matrix = load_connection(os.path.join(best_weights_dir, '_'.join([conn_name, ending + '_best'])))
 					else:
-						weight_matrix = np.load(os.path.join(end_weights_dir, '_'.join([conn_name, ending + '_end.npy'])))
+						weight_matrix = load_connection(os.path.join(end_weights_dir, '_'.join([conn_name, ending + '_end'])))
 
 				# create a connection from the first group in conn_name with the second group
 				connections[conn_name] = b.Connection(neuron_groups[conn_name[0:2]], neuron_groups[conn_name[2:4]], structure='sparse', state='g' + conn_type[0])
@@ -783,32 +782,37 @@ def build_network():
 		b.tight_layout()
 
 	# creating lattice locations for each patch
+	lattice = get_lattice_adjacency(n_e_sqrt, lattice_structure)
 	if connectivity == 'all':
 		lattice_locations = {}
 		for this_n in xrange(conv_features * n_e):
-			lattice_locations[this_n] = [ other_n for other_n in xrange(conv_features * n_e) if is_lattice_connection(n_e_sqrt, this_n % n_e, other_n % n_e, lattice_structure) ]
+			lattice_locations[this_n] = list(np.flatnonzero(np.tile(lattice[this_n % n_e], conv_features)))
 	elif connectivity == 'pairs':
 		lattice_locations = {}
 		for this_n in xrange(conv_features * n_e):
-			lattice_locations[this_n] = []
-			for other_n in xrange(conv_features * n_e):
-				if this_n // n_e % 2 == 0:
-					if is_lattice_connection(n_e_sqrt, this_n % n_e, other_n % n_e, lattice_structure) and other_n // n_e == this_n // n_e + 1:
-						lattice_locations[this_n].append(other_n)
-				elif this_n // n_e % 2 == 1:
-					if is_lattice_connection(n_e_sqrt, this_n % n_e, other_n % n_e, lattice_structure) and other_n // n_e == this_n // n_e - 1:
-						lattice_locations[this_n].append(other_n)
+			if this_n // n_e % 2 == 0:
+				other_feature = this_n // n_e + 1
+			else:
+				other_feature = this_n // n_e - 1
+
+			if other_feature < conv_features:
+				lattice_locations[this_n] = list(other_feature * n_e + np.flatnonzero(lattice[this_n % n_e]))
+			else:
+				lattice_locations[this_n] = []
 	elif connectivity == 'linear':
 		lattice_locations = {}
 		for this_n in xrange(conv_features * n_e):
-			lattice_locations[this_n] = []
-			for other_n in xrange(conv_features * n_e):
-				if this_n // n_e != conv_features - 1:
-					if is_lattice_connection(n_e_sqrt, this_n % n_e, other_n % n_e, lattice_structure) and other_n // n_e == this_n // n_e + 1:
-						lattice_locations[this_n].append(other_n)
-				elif this_n // n_e != 0:
-					if is_lattice_connection(n_e_sqrt, this_n % n_e, other_n % n_e, lattice_structure) and other_n // n_e == this_n // n_e - 1:
-						lattice_locations[this_n].append(other_n)
+			if this_n // n_e != conv_features - 1:
+				other_feature = this_n // n_e + 1
+			elif this_n // n_e != 0:
+				other_feature = this_n // n_e - 1
+			else:
+				other_feature = None
+
+			if other_feature is not None:
+				lattice_locations[this_n] = list(other_feature * n_e + np.flatnonzero(lattice[this_n % n_e]))
+			else:
+				lattice_locations[this_n] = []
 	elif connectivity == 'none':
 		lattice_locations = {}
 
@@ -836,9 +840,9 @@ def build_network():
 			# get weight matrix depending on training or test phase
 			if test_mode:
 				if save_best_model:
-					weight_matrix = np.load(os.path.join(best_weights_dir, '_'.join([conn_name, ending + '_best.npy'])))
+					weight_matrix = load_connection(os.path.join(best_weights_dir, '_'.join([conn_name, ending + '_best'])))
 				else:
-					weight_matrix = np.load(os.path.join(end_weights_dir, '_'.join([conn_name, ending + '_end.npy'])))
+					weight_matrix = load_connection(os.path.join(end_weights_dir, '_'.join([conn_name, ending + '_end'])))
 
 				# weight_matrix[weight_matrix < 0.20] = 0
 
@@ -332,7 +332,7 @@ def build_network():
 				conn_name = name + conn_type[0] + name + conn_type[1]
 
 				# load weight matrix
-				weight_matrix = np.load(os.path.join(best_weights_dir, '_'.join([conn_name, ending, 'best.npy'])))
+				weight_matrix = load_connection(os.path.join(best_weights_dir, '_'.join([conn_name, ending, 'best'])))
 				
 				# create a connection from the first group in conn_name with the second group
 				connections[conn_name] = b.Connection(neuron_groups[conn_name[0:2]], neuron_groups[conn_name[2:4]], structure='sparse', state='g' + conn_type[0])
@@ -382,7 +382,7 @@ def build_network():
 			conn_name = name[0] + conn_type[0] + name[1] + conn_type[1]
 
 			# get weight matrix depending on training or test phase
-			weight_matrix = np.load(os.path.join(best_weights_dir, '_'.join([conn_name, ending + '_best.npy'])))
+			weight_matrix = load_connection(os.path.join(best_weights_dir, '_'.join([conn_name, ending + '_best'])))
 
 			# create connections from the windows of the input group to the neuron population
 			input_connections[conn_name] = b.Connection(input_groups['Xe'], neuron_groups[name[1] + conn_type[1]], \
@@ -6,15 +6,29 @@ import cPickle as p
 import numpy as np
 import brian as b
 import os, sys
+import mmap
 
-from struct import unpack
+from collections import OrderedDict
+
+from struct import Struct
 from numpy import linalg as la
+from scipy.linalg import svd
+from scipy.linalg.lapack import dpotrf
+from scipy.sparse import csr_matrix, save_npz, load_npz
 from sklearn.preprocessing import normalize
 
 top_level_path = os.path.join('..', '..')
 MNIST_data_path = os.path.join(top_level_path, 'data')
 CIFAR10_data_path = os.path.join(top_level_path, 'data', 'cifar-10-batches-py')
 
+# IDX file headers: (magic number, number of images, rows, columns) and (magic number, number of labels)
+idx_images_header = Struct('>IIII')
+idx_labels_header = Struct('>II')
+
+# memory-mapped .npy files kept open by save_array, most recently used last
+array_memmaps = OrderedDict()
+max_array_memmaps = 32
+
 
 def nearestPD(A):
     """Find the nearest positive-definite matrix to input
@@ -26,9 +40,15 @@ def nearestPD(A):
     """
 
     B = (A + A.T) / 2
-    _, s, V = la.svd(B)
-
-    H = np.dot(V.T, np.dot(np.diag(s), V))
+    # B is symmetric, so its polar factor follows from the eigendecomposition
+    # (singular values are the absolute eigenvalues)
+    try:
+        w, V = la.eigh(B)
+        H = np.dot(V * np.abs(w), V.T)
+    except la.LinAlgError:
+        # fall back to the divide-and-conquer SVD if the eigensolver fails to converge
+        _, s, V = svd(B, full_matrices=False, overwrite_a=False, check_finite=False, lapack_driver='gesdd')
+        H = np.dot(V.T * s, V)
 
     A2 = (B + H) / 2
 
@@ -37,7 +57,7 @@ def nearestPD(A):
     if isPD(A3):
         return A3
 
-    spacing = np.spacing(la.norm(A))
+    spacing = np.spacing(la.norm(A, 'fro'))
     # The above is different from [1]. It appears that MATLAB's `chol` Cholesky
     # decomposition will accept matrixes with exactly 0-eigenvalue, whereas
     # Numpy's will not. So where [1] uses `eps(mineig)` (where `eps` is Matlab
@@ -47,23 +67,24 @@ def nearestPD(A):
     # `spacing` will, for Gaussian random matrixes of small dimension, be on
     # othe order of 1e-16. In practice, both ways converge, as the unit test
     # below suggests.
-    I = np.eye(A.shape[0])
-    k = 1
+    # Shift the spectrum once by the smallest eigenvalue, then keep doubling the
+    # shift (added in place along the diagonal) until the Cholesky test passes.
+    mineig = la.eigvalsh(A3)[0]
+    delta = max(-mineig, 0.0) + spacing
+    n = A3.shape[0]
     while not isPD(A3):
-        mineig = np.min(np.real(la.eigvals(A3)))
-        A3 += I * (-mineig * k**2 + spacing)
-        k += 1
+        A3.flat[::n + 1] += delta
+        delta *= 2.0
 
     return A3
 
 
 def isPD(B):
     """Returns true when input is positive-definite, via Cholesky"""
-    try:
-        _ = la.cholesky(B)
-        return True
-    except la.LinAlgError:
-        return False
+    # call LAPACK directly; failure (the common case in nearestPD) is reported
+    # through `info` rather than by raising and catching a LinAlgError
+    _, info = dpotrf(B, lower=1, overwrite_a=0, clean=0)
+    return info == 0
 
 
 def is_invertible(a):
@@ -82,11 +103,22 @@ def mhat(t, sigma=1.0, scale=1.0, shift=0.0, max_excite=np.inf, max_inhib=-np.in
 
 	See https://en.wikipedia.org/wiki/Mexican_hat_wavelet for more details and references.
 	'''
-	return -np.maximum(np.minimum(scale * np.divide(2, np.sqrt(3 * \
-								sigma) * (np.pi ** 0.25)) * (1.0 - \
-								np.square(np.divide(t, sigma))) * \
-								np.exp(-np.divide(np.square(t), 2 * \
-								np.square(sigma))) + shift, max_excite), max_inhib)
+	normalization = 2.0 / (np.sqrt(3 * sigma) * np.pi ** 0.25)
+	squared_t = np.square(np.divide(t, sigma))
+
+	return -np.clip(scale * normalization * (1.0 - squared_t) * np.exp(-0.5 * squared_t) + shift, max_inhib, max_excite)
+
+
+def map_read_only(file_name):
+	'''
+	Memory-map a whole file read-only. The file descriptor is closed before returning
+	(the map keeps its own), including when the map cannot be made.
+	'''
+	fd = os.open(file_name, os.O_RDONLY)
+	try:
+		return mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+	finally:
+		os.close(fd)
 
 
 def get_labeled_data(pickle_name, train=True, reduced_dataset=False, \
@@ -101,87 +133,84 @@ def get_labeled_data(pickle_name, train=True, reduced_dataset=False, \
 	elif normalized_inputs:
 		pickle_name = '_'.join([pickle_name, 'normalized_inputs'])
 
-	if os.path.isfile('%s.pickle' % pickle_name):
+	if os.path.isfile('%s_x.npy' % pickle_name) and os.path.isfile('%s_y.npy' % pickle_name):
+		# Memory-map the cached arrays; pages are only read in as examples are used
+		x = np.load('%s_x.npy' % pickle_name, mmap_mode='r')
+		y = np.load('%s_y.npy' % pickle_name, mmap_mode='r')
+		data = {'x': x, 'y': y, 'rows': x.shape[1], 'cols': x.shape[2]}
+	elif os.path.isfile('%s.pickle' % pickle_name):
 		data = p.load(open('%s.pickle' % pickle_name))
 	else:
-		# Open the images with gzip in read binary mode
 		if train:
-			images = open(os.path.join(MNIST_data_path, 'train-images-idx3-ubyte'), 'rb')
-			labels = open(os.path.join(MNIST_data_path, 'train-labels-idx1-ubyte'), 'rb')
+			images_path = os.path.join(MNIST_data_path, 'train-images-idx3-ubyte')
+			labels_path = os.path.join(MNIST_data_path, 'train-labels-idx1-ubyte')
 		else:
-			images = open(os.path.join(MNIST_data_path, 't10k-images-idx3-ubyte'), 'rb')
-			labels = open(os.path.join(MNIST_data_path, 't10k-labels-idx1-ubyte'), 'rb')
-
-		# Get metadata for images
-		images.read(4)  # skip the magic_number
-		number_of_images = unpack('>I', images.read(4))[0]
-		rows = unpack('>I', images.read(4))[0]
-		cols = unpack('>I', images.read(4))[0]
-
-		# Get metadata for labels
-		labels.read(4)  # skip the magic_number
-		N = unpack('>I', labels.read(4))[0]
-
-		if number_of_images != N:
-			raise Exception('number of labels did not match the number of images')
-
-		# Get the data
-		print '...Loading MNIST data from disk.'
-		print '\n'
-
-		x = np.zeros((N, rows, cols), dtype=np.uint8)  # Initialize numpy array
-		y = np.zeros((N, 1), dtype=np.uint8)  # Initialize numpy array
-
-		for i in xrange(N):
-			if i % 1000 == 0:
-				print 'Progress :', i, '/', N
-			x[i] = [[unpack('>B', images.read(1))[0] for unused_col in xrange(cols)] for unused_row in xrange(rows) ]
-			y[i] = unpack('>B', labels.read(1))[0]
-
-		print 'Progress :', N, '/', N, '\n'
+			images_path = os.path.join(MNIST_data_path, 't10k-images-idx3-ubyte')
+			labels_path = os.path.join(MNIST_data_path, 't10k-labels-idx1-ubyte')
+
+		# Memory-map the images and labels in read-only mode
+		images = map_read_only(images_path)
+		try:
+			labels = map_read_only(labels_path)
+			try:
+				# Get metadata for images
+				_, number_of_images, rows, cols = idx_images_header.unpack_from(images, 0)
+
+				# Get metadata for labels
+				_, N = idx_labels_header.unpack_from(labels, 0)
+
+				if number_of_images != N:
+					raise Exception('number of labels did not match the number of images')
+
+				# Get the data
+				print '...Loading MNIST data from disk.'
+				print '\n'
+
+				# Copy out of the mapped files so they can be closed
+				x = np.frombuffer(images, dtype=np.uint8, count=N * rows * cols, offset=idx_images_header.size).reshape((N, rows, cols)).copy()
+				y = np.frombuffer(labels, dtype=np.uint8, count=N, offset=idx_labels_header.size).reshape((N, 1)).copy()
+			finally:
+				labels.close()
+		finally:
+			images.close()
 
 		if reduced_dataset:
+			# Randomize order of data examples by writing each one straight to its shuffled position
+			permutation = np.random.permutation(examples_per_class * len(classes))
+			positions = np.argsort(permutation)
+
 			reduced_x = np.zeros((examples_per_class * len(classes), rows, cols), dtype=np.uint8)
 			for idx, class_index in enumerate(classes):
 				current = examples_per_class * idx
-				for example_index, example in enumerate(x):
-					if y[example_index] == class_index:
-						reduced_x[current, :, :] = x[example_index, :, :]
-						current += 1
-						if current == examples_per_class * (idx + 1):
-							break
-
-			reduced_y = np.array([ label // examples_per_class for label in xrange(examples_per_class * len(classes)) ],
-															dtype=np.uint8).reshape((examples_per_class * len(classes), 1))
-	
-			# Randomize order of data examples
-			rng_state = np.random.get_state()
-			np.random.shuffle(reduced_x)
-			np.random.set_state(rng_state)
-			np.random.shuffle(reduced_y)
+				example_indices = np.flatnonzero(y.ravel() == class_index)[:examples_per_class]
+				reduced_x[positions[current : current + len(example_indices)]] = x[example_indices]
+
+			reduced_y = np.repeat(np.arange(len(classes), dtype=np.uint8), examples_per_class)[permutation].reshape((-1, 1))
 
 			# Set data to reduced data
 			x, y = reduced_x, reduced_y
 
 		if normalized_inputs:
 			x = x.reshape([x.shape[0], rows * cols])
-			x = np.asarray(x, dtype=np.float64)
-			x_mean = np.sum(x) / (x.shape[0])
+			x = x.astype(np.float32)
+			# accumulate the dataset-wide total in double precision; per-image sums are exact in float32
+			x_mean = np.sum(x, dtype=np.float64) / (x.shape[0])
 
-			for i in xrange(x.shape[0]):
-				x[i, :] *= x_mean / np.sum(x[i, :]) 
+			# Rescale each image to the mean total intensity (leaving blank images as they are)
+			row_sums = x.sum(axis=1, keepdims=True)
+			np.multiply(x, x_mean / np.where(row_sums == 0, 1, row_sums), out=x)
 
 			x = x.reshape([x.shape[0], rows, cols])
 
 		data = {'x': x, 'y': y, 'rows': rows, 'cols': cols}
 
-		p.dump(data, open("%s.pickle" % pickle_name, "wb"))
+		np.save('%s_x.npy' % pickle_name, x)
+		np.save('%s_y.npy' % pickle_name, y)
 
 	return data
 
 
 def get_labeled_CIFAR10_data(train=True, single_channel=True):
-	data = {}
 	if train:
 		files = ['data_batch_1', 'data_batch_2', 'data_batch_3', 'data_batch_4', 'data_batch_5']
 	else:
@@ -189,20 +218,21 @@ def get_labeled_CIFAR10_data(train=True, single_channel=True):
 	
 	for idx, file in enumerate(files):
 		with open(os.path.join(CIFAR10_data_path, file), 'rb') as open_file:
-			if idx == 0:
-				data = p.load(open_file)
+			batch = p.load(open_file)
 
-				del data['batch_label']
-				del data['filenames']
-			else:
-				temp_data = p.load(open_file)
+		# all batches are the same size, so allocate the full dataset up front
+		if idx == 0:
+			batch_size = batch['data'].shape[0]
+			data = {'data' : np.empty((batch_size * len(files), batch['data'].shape[1]), dtype=np.uint8),
+					'labels' : np.empty(batch_size * len(files), dtype=np.int64)}
 
-				data['data'] = np.vstack([data['data'], temp_data['data']])
-				data['labels'] = np.hstack([data['labels'], temp_data['labels']])
+		data['data'][idx * batch_size : (idx + 1) * batch_size] = batch['data']
+		data['labels'][idx * batch_size : (idx + 1) * batch_size] = batch['labels']
 
 	if single_channel:
-		data['data'] = np.reshape(data['data'], (data['data'].shape[0], 3, 1024))
-		data['data'] = np.mean(data['data'], axis=1)
+		# average the color planes, summing the uint8 values straight into a float32 output
+		data['data'] = np.einsum('nkp->np', data['data'].reshape((data['data'].shape[0], 3, 1024)), dtype=np.float32)
+		data['data'] /= 3
 		data['data'] = data['data'].reshape((data['data'].shape[0], 32, 32))
 	else:
 		data['data'] = data['data'].reshape((data['data'].shape[0], 3, 32, 32))
@@ -210,48 +240,61 @@ def get_labeled_CIFAR10_data(train=True, single_channel=True):
 	return data
 
 
+# (row, column) offsets of the 4- and 8-neighborhoods on a square lattice
+lattice_offsets = {'none' : (), '4' : ((1, 0), (-1, 0), (0, 1), (0, -1)),
+		'8' : ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))}
+lattice_offsets['all'] = lattice_offsets['8']
+
+
 def is_lattice_connection(sqrt, i, j, lattice_structure):
 	'''
 	Boolean method which checks if two indices in a network correspond to neighboring nodes in a 4-, 8-, or all-lattice.
 
-	n_e: Square root of the number of nodes in population
+	sqrt: Square root of the number of nodes in population
 	i: First neuron's index
-	k: Second neuron's index
+	j: Second neuron's index
 	lattice_structure: Connectivity pattern between connected patches
 	'''
-	if lattice_structure == 'none':
-		return False
-	if lattice_structure == '4':
-		return i + 1 == j and j % sqrt != 0 or i - 1 == j and i % sqrt != 0 or i + sqrt == j or i - sqrt == j
-	if lattice_structure == '8':
-		return i + 1 == j and j % sqrt != 0 or i - 1 == j and i % sqrt != 0 or i + sqrt == j or i - sqrt == j \
-								or i + sqrt == j + 1 and j % sqrt != 0 or i + sqrt == j - 1 and i % sqrt != 0 \
-								or i - sqrt == j + 1 and i % sqrt != 0 or i - sqrt == j - 1 and j % sqrt != 0
 	if lattice_structure == 'all':
 		return True
 
+	(i_row, i_col), (j_row, j_col) = divmod(i, sqrt), divmod(j, sqrt)
+	return (j_row - i_row, j_col - i_col) in lattice_offsets.get(lattice_structure, ())
 
-def get_neighbors(n, sqrt):
-	i, j = n // sqrt, n % sqrt
-	
-	neighbors = []
-	for (i_, j_) in [(i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1), (i + 1, j + 1), \
-										(i + 1, j - 1), (i - 1, j + 1), (i - 1, j - 1)]:
-		if is_lattice_connection(sqrt, i * sqrt + j, i_ * sqrt + j_, '8') \
-					and i_ * sqrt + j_ >= 0 and i_ * sqrt + j_ < sqrt ** 2:
-			neighbors.append(i_ * sqrt + j_)
 
-	return neighbors
+def get_lattice_adjacency(sqrt, lattice_structure):
+	'''
+	Boolean adjacency matrix over all pairs of nodes in a population, with entry (i, j)
+	equal to is_lattice_connection(sqrt, i, j, lattice_structure).
+
+	sqrt: Square root of the number of nodes in population
+	lattice_structure: Connectivity pattern between connected patches
+	'''
+	n = sqrt ** 2
+	if lattice_structure == 'all':
+		return np.ones((n, n), dtype=bool)
+
+	rows, cols = np.divmod(np.arange(n), sqrt)
+	row_offsets, col_offsets = rows[np.newaxis, :] - rows[:, np.newaxis], cols[np.newaxis, :] - cols[:, np.newaxis]
+
+	adjacency = np.zeros((n, n), dtype=bool)
+	for (di, dj) in lattice_offsets.get(lattice_structure, ()):
+		adjacency |= (row_offsets == di) & (col_offsets == dj)
+
+	return adjacency
+
+
+def get_neighbors(n, sqrt):
+	return get_mesh_neighbors(n, sqrt, '8')
 
 
 def get_mesh_neighbors(n, sqrt, lattice):
-	i, j = n // sqrt, n % sqrt
-	
+	i, j = divmod(n, sqrt)
+
 	neighbors = []
-	for (i_, j_) in [(i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1), (i + 1, j + 1), \
-										(i + 1, j - 1), (i - 1, j + 1), (i - 1, j - 1)]:
-		if is_lattice_connection(sqrt, i * sqrt + j, i_ * sqrt + j_, str(lattice)) \
-					and i_ * sqrt + j_ >= 0 and i_ * sqrt + j_ < sqrt ** 2:
+	for (di, dj) in lattice_offsets[str(lattice)]:
+		i_, j_ = i + di, j + dj
+		if 0 <= i_ < sqrt and 0 <= j_ < sqrt:
 			neighbors.append(i_ * sqrt + j_)
 
 	return neighbors
@@ -265,18 +308,70 @@ def save_connections(weights_dir, connections, input_connections, ending, suffix
 	# merge two dictionaries of connections into one
 	connections.update(input_connections)
 
+	file_suffix = '_' + ending + ('_' + str(suffix) if suffix != None else '')
+
 	# save out each connection's parameters to disk
 	for connection_name in connections.keys():		
-		# get parameters of this connection
-		if type(connections[connection_name][:]) == b.DenseConnectionMatrix:
-			connection_matrix = connections[connection_name][:]
+		file_name = os.path.join(weights_dir, connection_name + file_suffix)
+
+		# save dense connections as-is, and only the nonzero entries of sparse ones
+		connection_matrix = connections[connection_name][:]
+		shape = (len(connections[connection_name].source), len(connections[connection_name].target))
+		if type(connection_matrix) == b.DenseConnectionMatrix:
+			np.save(file_name, connection_matrix, allow_pickle=False)
+		elif isinstance(connection_matrix, b.SparseConnectionMatrix):
+			# Brian already stores these row by row: values, column indices, and each row's start
+			row_pointers = np.append(connection_matrix.rowind[:shape[0]], len(connection_matrix.alldata))
+			save_npz(file_name, csr_matrix((connection_matrix.alldata, connection_matrix.allj, row_pointers), \
+													shape=shape), compressed=False)
 		else:
-			connection_matrix = connections[connection_name][:].todense()
-		# save it out to disk
-		if suffix != None:
-			np.save(os.path.join(weights_dir, connection_name + '_' + ending + '_' + str(suffix)), connection_matrix)
-		else:
-			np.save(os.path.join(weights_dir, connection_name + '_' + ending), connection_matrix)
+			save_npz(file_name, csr_matrix(connection_matrix.todense()), compressed=False)
+
+
+def load_connection(file_name):
+	'''
+	Load a connection's weight matrix, saved by save_connections, as a dense array.
+	The file name may be given with or without its '.npy' / '.npz' extension.
+	'''
+	if os.path.splitext(file_name)[1] in ['.npy', '.npz']:
+		file_name = os.path.splitext(file_name)[0]
+
+	if os.path.isfile(file_name + '.npz'):
+		return load_npz(file_name + '.npz').toarray()
+
+	return np.load(file_name + '.npy')
+
+
+def save_array(file_name, array):
+	'''
+	Save an array to a .npy file through a memory map, which is kept open so that
+	repeated saves to the same file only copy the array into the mapped pages.
+	'''
+	if not file_name.endswith('.npy'):
+		file_name += '.npy'
+
+	memmap, identity = array_memmaps.pop(file_name, (None, None))
+
+	# only reuse the map if the file on disk is still the one it was opened on, at its
+	# original size (it may have been deleted, replaced, or truncated by another writer)
+	try:
+		stat = os.stat(file_name)
+		replaced = (stat.st_ino, stat.st_size) != identity
+	except OSError:
+		replaced = True
+
+	if memmap is None or replaced or memmap.shape != array.shape or memmap.dtype != array.dtype:
+		memmap = np.lib.format.open_memmap(file_name, mode='w+', dtype=array.dtype, shape=array.shape)
+		stat = os.stat(file_name)
+		identity = stat.st_ino, stat.st_size
+
+	memmap[...] = array
+	memmap.flush()
+
+	# close the least recently used maps once too many are open (e.g. per-iteration suffixes)
+	array_memmaps[file_name] = memmap, identity
+	while len(array_memmaps) > max_array_memmaps:
+		array_memmaps.popitem(last=False)
 
 
 def save_theta(weights_dir, populations, neuron_groups, ending, suffix):
@@ -285,13 +380,12 @@ def save_theta(weights_dir, populations, neuron_groups, ending, suffix):
 	Save the adaptive threshold parameters out to disk.
 	'''
 
+	file_suffix = '_' + ending + ('_' + str(suffix) if suffix != None else '')
+
 	# iterate over population for which to save theta parameters
 	for population in populations:
 		# save out the theta parameters to file
-		if suffix != None:
-			np.save(os.path.join(weights_dir, 'theta_' + population + '_' + ending + '_' + str(suffix)), neuron_groups[population + 'e'].theta)
-		else:
-			np.save(os.path.join(weights_dir, 'theta_' + population + '_' + ending), neuron_groups[population + 'e'].theta)
+		save_array(os.path.join(weights_dir, 'theta_' + population + file_suffix), np.asarray(neuron_groups[population + 'e'].theta))
 
 
 def save_assignments(weights_dir, assignments, ending, suffix):
@@ -300,13 +394,13 @@ def save_assignments(weights_dir, assignments, ending, suffix):
 	'''
 
 	# save the labels assigned to excitatory neurons out to disk
-	np.save(os.path.join(weights_dir, '_'.join(['assignments', ending, str(suffix)])), assignments)
+	save_array(os.path.join(weights_dir, '_'.join(['assignments', ending, str(suffix)])), np.asarray(assignments))
 
 
 def save_accumulated_rates(weights_dir, accumulated_rates, ending, suffix):
 	'''
-	Save neuron class labels out to disk.
+	Save neurons' accumulated firing rates per class out to disk.
 	'''
 
-	# save the labels assigned to excitatory neurons out to disk
-	np.save(os.path.join(weights_dir, '_'.join(['accumulated_rates', ending, str(suffix)])), assignments)
\ No newline at end of file
+	# save the per-class firing rates of excitatory neurons out to disk
+	save_array(os.path.join(weights_dir, '_'.join(['accumulated_rates', ending, str(suffix)])), np.asarray(accumulated_rates))
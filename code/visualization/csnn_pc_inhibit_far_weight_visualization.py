@@ -12,6 +12,9 @@ from scipy.sparse import coo_matrix
 from struct import unpack
 from brian import *
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'train'))
+from util import load_connection
+
 
 parser = argparse.ArgumentParser()
 parser.add_argument('--directory', default='best')
@@ -196,11 +199,11 @@ convolution_locations = {}
 for n in xrange(n_e):
 	convolution_locations[n] = [ ((n % n_e_sqrt) * conv_stride + (n // n_e_sqrt) * n_input_sqrt * conv_stride) + (x * n_input_sqrt) + y for y in xrange(conv_size) for x in xrange(conv_size) ]
 
-weight_matrix = np.load(os.path.join(weight_dir, file_name))
+weight_matrix = load_connection(os.path.join(weight_dir, file_name))
 
 wmax_ee = np.max(weight_matrix)
 
-input_weight_monitor, fig_weights = plot_2d_input_weights(' '.join(file_name[:-4].split('_')))
+input_weight_monitor, fig_weights = plot_2d_input_weights(' '.join(os.path.splitext(file_name)[0].split('_')))
 
-plt.savefig(os.path.join(plots_dir, file_name[:-4] + '.png'))
+plt.savefig(os.path.join(plots_dir, os.path.splitext(file_name)[0] + '.png'))
 plt.show()
@@ -9,6 +9,9 @@ from scipy.sparse import coo_matrix
 from struct import unpack
 from brian import *
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'train'))
+from util import load_connection
+
 fig_num = 0
 wmax_ee = 1
 
@@ -34,7 +37,7 @@ def is_lattice_connection(sqrt, i, j):
 	if lattice_structure == '4':
 		return i + 1 == j and j % sqrt != 0 or i - 1 == j and i % sqrt != 0 or i + sqrt == j or i - sqrt == j
 	if lattice_structure == '8':
-		return i + 1 == j and j % sqrt != 0 or i - 1 == j and i % sqrt != 0 or i + sqrt == j or i - sqrt == j or i + sqrt == j + 1 and j % sqrt != 0 or i + sqrt == j - 1 and i % sqrt != 0 or i - sqrt == j + 1 and i % sqrt != 0 or i - sqrt == j - 1 and j % sqrt != 0
+		return i + 1 == j and j % sqrt != 0 or i - 1 == j and i % sqrt != 0 or i + sqrt == j or i - sqrt == j or i + sqrt == j + 1 and i % sqrt != 0 or i + sqrt == j - 1 and j % sqrt != 0 or i - sqrt == j + 1 and i % sqrt != 0 or i - sqrt == j - 1 and j % sqrt != 0
 	if lattice_structure == 'all':
 		return True
 
@@ -223,9 +226,9 @@ convolution_locations = {}
 for n in xrange(n_e):
 	convolution_locations[n] = [ ((n % n_e_sqrt) * conv_stride + (n // n_e_sqrt) * n_input_sqrt * conv_stride) + (x * n_input_sqrt) + y for y in xrange(conv_size) for x in xrange(conv_size) ]
 
-weight_matrix = np.load(os.path.join(weight_dir, file_name))
+weight_matrix = load_connection(os.path.join(weight_dir, file_name))
 
-patch_weight_matrix = np.load(os.path.join(weight_dir, file_name.replace('XeAe', 'AeAe')))
+patch_weight_matrix = load_connection(os.path.join(weight_dir, file_name.replace('XeAe', 'AeAe')))
 patch_weight_matrix[patch_weight_matrix < np.percentile(patch_weight_matrix, 99.9)] = 0
 patch_weight_matrix[np.nonzero(patch_weight_matrix)] = 1
 
@@ -245,5 +248,5 @@ fig_num += 1
 # 					[(ordering[i % n_e, i // conv_features] // conv_features) * conv_size + (conv_size // 2), \
 # 					 (ordering[j % n_e, j // conv_features] // conv_features) * conv_size + (conv_size // 2)], color='gray', linestyle='--', linewidth=1)
 
-plt.savefig(os.path.join(plots_dir, file_name[:-4] + '_patch_connectivity.png'))
+plt.savefig(os.path.join(plots_dir, os.path.splitext(file_name)[0] + '_patch_connectivity.png'))
 plt.show()
@@ -10,6 +10,9 @@ from scipy.sparse import coo_matrix
 from struct import unpack
 from brian import *
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'train'))
+from util import load_connection
+
 fig_num = 0
 wmax_ee = 1.0
 
@@ -22,13 +25,16 @@ weight_dir = os.path.join(top_level_path, 'weights', model_name)
 
 def get_matrix_from_file(file_name, n_src, n_tgt):
 	'''
-	Given the name of a file pointing to a .npy ndarray object, load it into
-	'weight_matrix' and return it
+	Given the name of a file pointing to a saved weight matrix ('.npy' or '.npz'), or to an
+	array of (row, column, value) triples, load it into 'weight_matrix' and return it
 	'''
 
 	# load the stored ndarray into 'readout', instantiate 'weight_matrix' as
 	# correctly-shaped zeros matrix
-	readout = np.load(file_name)
+	readout = load_connection(file_name)
+	if readout.shape == (n_src, n_tgt):
+		return readout
+
 	weight_matrix = np.zeros((n_src, n_tgt))
 
 	# read the 'readout' ndarray values into weight_matrix by (row, column) indices
@@ -85,21 +91,21 @@ def is_lattice_connection(sqrt, i, j):
 	if lattice_structure == '4':
 		return i + 1 == j and j % sqrt != 0 or i - 1 == j and i % sqrt != 0 or i + sqrt == j or i - sqrt == j
 	if lattice_structure == '8':
-		return i + 1 == j and j % sqrt != 0 or i - 1 == j and i % sqrt != 0 or i + sqrt == j or i - sqrt == j or i + sqrt == j + 1 and j % sqrt != 0 or i + sqrt == j - 1 and \
-																						i % sqrt != 0 or i - sqrt == j + 1 and i % sqrt != 0 or i - sqrt == j - 1 and j % sqrt != 0
+		return i + 1 == j and j % sqrt != 0 or i - 1 == j and i % sqrt != 0 or i + sqrt == j or i - sqrt == j or i + sqrt == j + 1 and i % sqrt != 0 or i + sqrt == j - 1 and \
+																						j % sqrt != 0 or i - sqrt == j + 1 and i % sqrt != 0 or i - sqrt == j - 1 and j % sqrt != 0
 	if lattice_structure == 'all':
 		return True
 
 
 print '\n'
-print '\n'.join([ str(idx) + ' | ' + file_name for idx, file_name in enumerate([ file_name for file_name in sorted(os.listdir(weight_dir)) if 'AeAe' in file_name and 'all' in file_name and '.npy' in file_name ]) ])
+print '\n'.join([ str(idx) + ' | ' + file_name for idx, file_name in enumerate([ file_name for file_name in sorted(os.listdir(weight_dir)) if 'AeAe' in file_name and 'all' in file_name and os.path.splitext(file_name)[1] in ['.npy', '.npz'] ]) ])
 print '\n'
 
 to_plot = raw_input('Enter the index of the file from above which you\'d like to use: ')
 if to_plot == '':
-	file_name = [ file_name for file_name in sorted(os.listdir(weight_dir)) if 'AeAe' in file_name and 'all' in file_name and '.npy' in file_name ][0]
+	file_name = [ file_name for file_name in sorted(os.listdir(weight_dir)) if 'AeAe' in file_name and 'all' in file_name and os.path.splitext(file_name)[1] in ['.npy', '.npz'] ][0]
 else:
-	file_name = [ file_name for file_name in sorted(os.listdir(weight_dir)) if 'AeAe' in file_name and 'all' in file_name and '.npy' in file_name ][int(to_plot)]
+	file_name = [ file_name for file_name in sorted(os.listdir(weight_dir)) if 'AeAe' in file_name and 'all' in file_name and os.path.splitext(file_name)[1] in ['.npy', '.npz'] ][int(to_plot)]
 
 # number of inputs to the network
 n_input = 784
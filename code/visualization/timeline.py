@@ -14,6 +14,9 @@ from struct import unpack
 from brian import *
 from matplotlib import gridspec
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'train'))
+from util import load_connection
+
 fig_num = 0
 wmax_ee = 1
 
@@ -44,8 +47,8 @@ def onclick(event):
         # indx = np.searchsorted(ax.get_lines()[1].get_data()[0], [event.xdata])[0]
         iteration = ((int(x/10)+t)*10)
         print "iteration = " + str(iteration)
-        new_file_name = 'XeAe_' + '_'.join(file_name.split('_')[1:-1]) + '_' + str(iteration) + '.npy'
-        weight_matrix = np.load(os.path.join(weight_dir, new_file_name))
+        new_file_name = 'XeAe_' + '_'.join(file_name.split('_')[1:-1]) + '_' + str(iteration)
+        weight_matrix = load_connection(os.path.join(weight_dir, new_file_name))
         plt.subplot(211).clear()
 
         '''
@@ -90,7 +93,7 @@ def is_lattice_connection(sqrt, i, j):
     if lattice_structure == '4':
         return i + 1 == j and j % sqrt != 0 or i - 1 == j and i % sqrt != 0 or i + sqrt == j or i - sqrt == j
     if lattice_structure == '8':
-        return i + 1 == j and j % sqrt != 0 or i - 1 == j and i % sqrt != 0 or i + sqrt == j or i - sqrt == j or i + sqrt == j + 1 and j % sqrt != 0 or i + sqrt == j - 1 and i % sqrt != 0 or i - sqrt == j + 1 and i % sqrt != 0 or i - sqrt == j - 1 and j % sqrt != 0
+        return i + 1 == j and j % sqrt != 0 or i - 1 == j and i % sqrt != 0 or i + sqrt == j or i - sqrt == j or i + sqrt == j + 1 and i % sqrt != 0 or i + sqrt == j - 1 and j % sqrt != 0 or i - sqrt == j + 1 and i % sqrt != 0 or i - sqrt == j - 1 and j % sqrt != 0
     if lattice_structure == 'all':
         return True
 
@@ -313,14 +316,14 @@ def plot_performance(perf_file_name):
 # --------------------------
 print '\n'
 print '\n'.join([str(idx) + ' | ' + file_name for idx, file_name in
-                 enumerate([file_name for file_name in sorted(os.listdir(weight_dir)) if ('XeAe' in file_name) and file_name.split('npy')[0].split('_')[-1][0:-1] ==  file_name.split('npy')[0].split('_')[-2]])])
+                 enumerate([file_name for file_name in sorted(os.listdir(weight_dir)) if ('XeAe' in file_name) and os.path.splitext(file_name)[0].split('_')[-1] == os.path.splitext(file_name)[0].split('_')[-2]])])
 print '\n'
 
 to_plot = raw_input('Enter the index of the file from above which you\'d like to plot: ')
 if to_plot == '':
-    file_name = [file_name for file_name in sorted(os.listdir(weight_dir)) if ('XeAe' in file_name) and file_name.split('npy')[0].split('_')[-1][0:-1] ==  file_name.split('npy')[0].split('_')[-2]][0]
+    file_name = [file_name for file_name in sorted(os.listdir(weight_dir)) if ('XeAe' in file_name) and os.path.splitext(file_name)[0].split('_')[-1] == os.path.splitext(file_name)[0].split('_')[-2]][0]
 else:
-    file_name = [file_name for file_name in sorted(os.listdir(weight_dir)) if ('XeAe' in file_name) and file_name.split('npy')[0].split('_')[-1][0:-1] ==  file_name.split('npy')[0].split('_')[-2]][int(to_plot)]
+    file_name = [file_name for file_name in sorted(os.listdir(weight_dir)) if ('XeAe' in file_name) and os.path.splitext(file_name)[0].split('_')[-1] == os.path.splitext(file_name)[0].split('_')[-2]][int(to_plot)]
 print file_name
 sort_euclidean = raw_input('Sort plot by Euclidean distance? (y / n, default no): ')
 if sort_euclidean in ['', 'n']:
@@ -373,10 +376,10 @@ for n in xrange(n_e):
         ((n % n_e_sqrt) * conv_stride + (n // n_e_sqrt) * n_input_sqrt * conv_stride) + (x * n_input_sqrt) + y for y in
         xrange(conv_size) for x in xrange(conv_size)]
 
-weight_matrix = np.load(os.path.join(weight_dir, file_name))
+weight_matrix = load_connection(os.path.join(weight_dir, file_name))
 
 
-patch_weight_matrix = np.load(os.path.join(weight_dir, file_name.replace('XeAe', 'AeAe')))
+patch_weight_matrix = load_connection(os.path.join(weight_dir, file_name.replace('XeAe', 'AeAe')))
 patch_weight_matrix[patch_weight_matrix < np.percentile(patch_weight_matrix, 99.9)] = 0
 patch_weight_matrix[np.nonzero(patch_weight_matrix)] = 1
 
@@ -386,5 +389,5 @@ fig_num += 1
 
 input_weight_monitor, fig_weights = plot_2d_input_weights(weight_matrix)
 
-plt.savefig(os.path.join(plots_dir, file_name[:-4] + '_patch_connectivity.png'))
+plt.savefig(os.path.join(plots_dir, os.path.splitext(file_name)[0] + '_patch_connectivity.png'))
 plt.show()
@@ -3,6 +3,7 @@ import argparse
 import numpy as np
 import matplotlib.pyplot as plt
 
+from scipy.sparse import load_npz
 from sklearn.decomposition import PCA
 from mpl_toolkits.mplot3d import Axes3D
 
@@ -57,7 +58,11 @@ ending = '_'.join([ str(conv_size), str(conv_stride), str(conv_features), str(n_
 												str(start_inhib), str(max_inhib), 'best' ])
 
 # Get filter weights.
-weights = np.load(os.path.join(weights_path, '_'.join(['XeAe', ending]) + '.npy')).T
+weights_file = os.path.join(weights_path, '_'.join(['XeAe', ending]))
+if os.path.isfile(weights_file + '.npz'):
+	weights = load_npz(weights_file + '.npz').toarray().T
+else:
+	weights = np.load(weights_file + '.npy').T
 
 # Get neuron assignments.
 assignments = np.load(os.path.join(assignments_path, '_'.join(['assignments', ending]) + '.npy')).ravel()